@@ -1,37 +1,124 @@
 import ccxt
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from functools import lru_cache
+import re
+import threading
 import time
 
+# Exchange clients are created once per process and shared by all fetches (and threads),
+# so HTTP sessions and loaded markets are reused instead of rebuilt per symbol
+_EXCHANGES = None
+_EXCHANGES_LOCK = threading.Lock()
+
+def _serialize_throttle(exchange):
+    """
+    Make ccxt's rate limiter safe for a client shared by the fetch threads
+    The sync throttle() reads lastRestRequestTimestamp unlocked, so concurrent
+    callers would all pass it at once and enableRateLimit would stop limiting
+    """
+    throttle = exchange.throttle
+    lock = threading.Lock()
+    
+    def locked_throttle(cost=None):
+        with lock:
+            throttle(cost)
+            # Claim the slot before releasing, so the next thread waits a full interval
+            exchange.lastRestRequestTimestamp = exchange.milliseconds()
+    
+    exchange.throttle = locked_throttle
+
 # Initialize exchanges
 def init_exchanges():
     """Initialize multiple exchanges with public APIs (KuCoin and OKX only - no geo-restrictions)"""
-    exchanges = {
-        'kucoin': ccxt.kucoin({'enableRateLimit': True}),
-        'okx': ccxt.okx({'enableRateLimit': True})
-    }
-    return exchanges
+    global _EXCHANGES
+    
+    with _EXCHANGES_LOCK:
+        if _EXCHANGES is None:
+            _EXCHANGES = {
+                'kucoin': ccxt.kucoin({'enableRateLimit': True}),
+                'okx': ccxt.okx({'enableRateLimit': True})
+            }
+            
+            # Fetch threads share these clients - keep their rate limiters effective
+            for exchange in _EXCHANGES.values():
+                _serialize_throttle(exchange)
+    return _EXCHANGES
+
+# Markets are refreshed at most once per MARKETS_TTL_SECONDS per exchange.
+# A failed load is not retried for MARKETS_RETRY_SECONDS, so an unreachable
+# exchange fails fast and fetches move on to the fallback exchange.
+MARKETS_TTL_SECONDS = 3600
+MARKETS_RETRY_SECONDS = 300
+_MARKETS_LOADED = {}
+_MARKETS_FAILED = {}
+_MARKETS_LOCKS = {}
+
+def _ensure_markets(exchange):
+    """Load exchange markets once (and again only after the TTL), instead of on every fetch"""
+    # One lock per exchange - a slow load on one must not block the others
+    lock = _MARKETS_LOCKS.setdefault(exchange.id, threading.Lock())
+    
+    with lock:
+        loaded_at = _MARKETS_LOADED.get(exchange.id)
+        now = time.monotonic()
+        
+        if loaded_at is None or now - loaded_at > MARKETS_TTL_SECONDS:
+            failed_at = _MARKETS_FAILED.get(exchange.id)
+            
+            if failed_at is not None and now - failed_at < MARKETS_RETRY_SECONDS:
+                # Recently failed - don't hit the exchange again yet (stale markets are still usable)
+                if loaded_at is None:
+                    raise ccxt.ExchangeNotAvailable(f"{exchange.id} markets failed to load, retrying later")
+            else:
+                try:
+                    exchange.load_markets(reload=loaded_at is not None)
+                except Exception:
+                    _MARKETS_FAILED[exchange.id] = now
+                    if loaded_at is None:
+                        raise
+                else:
+                    _MARKETS_FAILED.pop(exchange.id, None)
+                    _MARKETS_LOADED[exchange.id] = now
+    
+    return exchange.markets
+
+# BASE + common quote currency; the non-empty base keeps bare BTC/ETH from parsing as "/BTC"
+_QUOTE_RE = re.compile(r'^(.+?)(USDT|USDC|BUSD|USD|BTC|ETH)$')
 
+@lru_cache(maxsize=4096)
 def format_symbol(symbol):
     """
     Format symbol to standard CCXT format (BASE/QUOTE)
-    Handles: BTCUSDT -> BTC/USDT, BTC/USDT -> BTC/USDT
+    Handles: BTCUSDT -> BTC/USDT, BTC/USDT -> BTC/USDT, BTC -> BTC/USDT
     """
     # If already has /, return as is
     if '/' in symbol:
         return symbol
     
-    # Common quote currencies
-    quote_currencies = ['USDT', 'USD', 'BUSD', 'USDC', 'BTC', 'ETH']
-    
-    for quote in quote_currencies:
-        if symbol.endswith(quote):
-            base = symbol[:-len(quote)]
-            return f"{base}/{quote}"
+    match = _QUOTE_RE.match(symbol)
+    if match:
+        return f"{match.group(1)}/{match.group(2)}"
     
     # Default to /USDT if no quote found
     return f"{symbol}/USDT"
 
+def ohlcv_to_dataframe(ohlcv):
+    """
+    Convert CCXT OHLCV rows to a DataFrame
+    Goes through a single float64 array instead of letting pandas infer dtypes row by row
+    """
+    arr = np.asarray(ohlcv, dtype=np.float64)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms'),
+        'open': arr[:, 1],
+        'high': arr[:, 2],
+        'low': arr[:, 3],
+        'close': arr[:, 4],
+        'volume': arr[:, 5]
+    })
+
 def fetch_ohlcv_multi_exchange(symbol, timeframe='30m', limit=100):
     """
     Fetch OHLCV data from multiple exchanges (fallback mechanism)
@@ -47,8 +134,8 @@ def fetch_ohlcv_multi_exchange(symbol, timeframe='30m', limit=100):
         try:
             exchange = exchanges[exchange_name]
             
-            # Load markets to check if symbol exists
-            exchange.load_markets()
+            # Load markets (cached) to check if symbol exists
+            _ensure_markets(exchange)
             
             # Check if symbol exists on this exchange
             if symbol not in exchange.markets:
@@ -59,24 +146,23 @@ def fetch_ohlcv_multi_exchange(symbol, timeframe='30m', limit=100):
             ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
             
             if not ohlcv or len(ohlcv) < 50:
-                print(f"  ⚠ {exchange_name.upper()}: Insufficient data ({len(ohlcv) if ohlcv else 0} candles)")
+                print(f"  ⚠ {exchange_name.upper()}: Insufficient data for {symbol} ({len(ohlcv) if ohlcv else 0} candles)")
                 continue
             
             # Convert to DataFrame
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df = ohlcv_to_dataframe(ohlcv)
             
-            print(f"  ✓ Data fetched from {exchange_name.upper()}: {len(df)} candles")
+            print(f"  ✓ {symbol} fetched from {exchange_name.upper()}: {len(df)} candles")
             return df
             
         except ccxt.NetworkError as e:
-            print(f"  ⚠ {exchange_name.upper()} network error: {str(e)[:100]}")
+            print(f"  ⚠ {exchange_name.upper()} network error for {symbol}: {str(e)[:100]}")
             continue
         except ccxt.ExchangeError as e:
-            print(f"  ⚠ {exchange_name.upper()} exchange error: {str(e)[:100]}")
+            print(f"  ⚠ {exchange_name.upper()} exchange error for {symbol}: {str(e)[:100]}")
             continue
         except Exception as e:
-            print(f"  ⚠ {exchange_name.upper()} failed: {str(e)[:100]}")
+            print(f"  ⚠ {exchange_name.upper()} failed for {symbol}: {str(e)[:100]}")
             continue
     
     print(f"  ✗ All exchanges failed for {symbol}")
@@ -94,16 +180,15 @@ def fetch_ohlcv_direct(exchange_name, symbol, timeframe='30m', limit=100):
         if not exchange:
             raise ValueError(f"Exchange {exchange_name} not supported")
         
-        # Load markets
-        exchange.load_markets()
+        # Load markets (cached)
+        _ensure_markets(exchange)
         
         if symbol not in exchange.markets:
             raise ValueError(f"{symbol} not available on {exchange_name}")
         
         ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
         
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df = ohlcv_to_dataframe(ohlcv)
         
         return df
         
@@ -111,6 +196,9 @@ def fetch_ohlcv_direct(exchange_name, symbol, timeframe='30m', limit=100):
         print(f"Error fetching from {exchange_name}: {str(e)}")
         return None
 
+# USDT pair list per exchange, tagged with the market load it was built from
+_USDT_PAIRS_CACHE = {}
+
 def get_available_symbols(exchange_name='kucoin'):
     """Get list of all available symbols from exchange"""
     try:
@@ -120,13 +208,17 @@ def get_available_symbols(exchange_name='kucoin'):
         if not exchange:
             return []
         
-        exchange.load_markets()
-        symbols = list(exchange.markets.keys())
+        _ensure_markets(exchange)
+        loaded_at = _MARKETS_LOADED[exchange.id]
         
-        # Filter USDT pairs only
-        usdt_pairs = [s for s in symbols if '/USDT' in s]
+        # Reuse the filtered list until markets are reloaded
+        cached = _USDT_PAIRS_CACHE.get(exchange.id)
+        if cached is None or cached[0] != loaded_at:
+            # Filter USDT pairs only (endswith skips derivatives like BTC/USDT:USDT)
+            cached = (loaded_at, tuple(s for s in exchange.symbols if s.endswith('/USDT')))
+            _USDT_PAIRS_CACHE[exchange.id] = cached
         
-        return usdt_pairs
+        return list(cached[1])
         
     except Exception as e:
         print(f"Error loading markets: {str(e)}")
@@ -1,99 +1,156 @@
+import math
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 
-def calculate_rsi(close, length=14):
-    """Calculate RSI indicator"""
-    delta = close.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=length).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=length).mean()
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional - without it the kernels below run as plain Python over numpy arrays
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+def _wilder_average(values, length):
+    """
+    Wilder's moving average (Pine Script ta.rma) of a diff array whose first element is undefined
+    Seeded with the SMA of the first `length` values, then smoothed with alpha = 1/length
+    """
+    seeded = np.full(len(values), np.nan)
+    if len(values) > length:
+        seeded[length] = values[1:length + 1].mean()
+        seeded[length + 1:] = values[length + 1:]
     
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
+    return pd.Series(seeded).ewm(alpha=1 / length, adjust=False).mean().to_numpy()
+
+def _rsi_array(close, length):
+    """RSI of a float64 close array as a float64 array"""
+    delta = np.empty_like(close)
+    delta[:1] = np.nan
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    
+    gain = _wilder_average(np.where(delta > 0, delta, 0.0), length)
+    loss = _wilder_average(np.where(delta < 0, -delta, 0.0), length)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+def calculate_rsi(close, length=14):
+    """Calculate RSI indicator (Wilder's smoothing, same as ta.rsi in Pine Script)"""
+    rsi = _rsi_array(close.to_numpy(dtype=np.float64), length)
     
-    return rsi
+    return pd.Series(rsi, index=close.index)
 
-def calculate_parabolic_sar_on_rsi(rsi, start=0.02, increment=0.02, maximum=0.2):
+# Explicit signature: compiled (or loaded from cache) at import instead of on the first scanned coin.
+# Callers must pass a writable, C-contiguous float64 array.
+@njit('Tuple((f8[::1], b1[::1]))(f8[::1], f8, f8, f8)', cache=True)
+def _sar_on_rsi_kernel(rsi, start, increment, maximum):
     """
-    Calculate Parabolic SAR on RSI values (not price)
-    This is the key difference - SAR is applied to RSI line itself
+    Parabolic SAR recursion over a float64 RSI array -> (sar, is_below) arrays
     
-    Based on ChartPrime's Pine Script implementation
+    Single pass: the RSI +/- 1 band, extreme point and acceleration are carried
+    as scalars, only the two output arrays are materialized.
     """
-    rsi_high = rsi + 1
-    rsi_low = rsi - 1
-    
-    result = np.full(len(rsi), np.nan)
-    max_min = np.full(len(rsi), np.nan)
-    acceleration = np.full(len(rsi), np.nan)
-    is_below = np.full(len(rsi), False, dtype=bool)
+    n = len(rsi)
+    result = np.full(n, np.nan)
+    is_below = np.zeros(n, dtype=np.bool_)
     
     # Initialize first valid values
-    for i in range(1, len(rsi)):
-        if pd.notna(rsi.iloc[i]) and pd.notna(rsi.iloc[i-1]):
-            if rsi.iloc[i] > rsi.iloc[i-1]:
+    first = 0
+    for i in range(1, n):
+        if not np.isnan(rsi[i]) and not np.isnan(rsi[i-1]):
+            if rsi[i] > rsi[i-1]:
                 is_below[i] = True
-                max_min[i] = rsi_high.iloc[i]
-                result[i] = rsi_low.iloc[i-1]
+                max_min = rsi[i] + 1
+                result[i] = rsi[i-1] - 1
             else:
                 is_below[i] = False
-                max_min[i] = rsi_low.iloc[i]
-                result[i] = rsi_high.iloc[i-1]
+                max_min = rsi[i] - 1
+                result[i] = rsi[i-1] + 1
             
-            acceleration[i] = start
+            acceleration = start
+            first = i
             break
     
-    # Calculate SAR for remaining bars
-    for i in range(2, len(rsi)):
-        if pd.isna(result[i-1]):
-            continue
+    if first == 0:
+        return result, is_below
+    
+    below = is_below[first]
+    
+    # Calculate SAR for remaining bars (stops for good once SAR turns NaN)
+    for i in range(first + 1, n):
+        prev = result[i-1]
+        if np.isnan(prev):
+            break
         
+        rsi_high = rsi[i] + 1
+        rsi_low = rsi[i] - 1
         is_first_trend_bar = False
         
         # Calculate new SAR value
-        result[i] = result[i-1] + acceleration[i-1] * (max_min[i-1] - result[i-1])
-        
-        # Copy previous values
-        is_below[i] = is_below[i-1]
-        max_min[i] = max_min[i-1]
-        acceleration[i] = acceleration[i-1]
+        sar = prev + acceleration * (max_min - prev)
         
         # Check for trend reversal
-        if is_below[i]:
-            if result[i] > rsi_low.iloc[i]:
+        if below:
+            if sar > rsi_low:
                 is_first_trend_bar = True
-                is_below[i] = False
-                result[i] = max(rsi_high.iloc[i], max_min[i])
-                max_min[i] = rsi_low.iloc[i]
-                acceleration[i] = start
+                below = False
+                sar = max_min if max_min > rsi_high else rsi_high
+                max_min = rsi_low
+                acceleration = start
         else:
-            if result[i] < rsi_high.iloc[i]:
+            if sar < rsi_high:
                 is_first_trend_bar = True
-                is_below[i] = True
-                result[i] = min(rsi_low.iloc[i], max_min[i])
-                max_min[i] = rsi_high.iloc[i]
-                acceleration[i] = start
+                below = True
+                sar = max_min if max_min < rsi_low else rsi_low
+                max_min = rsi_high
+                acceleration = start
         
         # Update acceleration and extreme point
+        # (ternary clamp instead of min() - numba lowers it to a branchless minsd)
         if not is_first_trend_bar:
-            if is_below[i]:
-                if rsi_high.iloc[i] > max_min[i]:
-                    max_min[i] = rsi_high.iloc[i]
-                    acceleration[i] = min(acceleration[i] + increment, maximum)
+            if below:
+                if rsi_high > max_min:
+                    max_min = rsi_high
+                    acceleration += increment
+                    acceleration = acceleration if acceleration < maximum else maximum
             else:
-                if rsi_low.iloc[i] < max_min[i]:
-                    max_min[i] = rsi_low.iloc[i]
-                    acceleration[i] = min(acceleration[i] + increment, maximum)
+                if rsi_low < max_min:
+                    max_min = rsi_low
+                    acceleration += increment
+                    acceleration = acceleration if acceleration < maximum else maximum
         
         # Ensure SAR doesn't penetrate last two lows/highs
-        if is_below[i]:
-            result[i] = min(result[i], rsi_low.iloc[i-1])
-            if i >= 2:
-                result[i] = min(result[i], rsi_low.iloc[i-2])
+        if below:
+            if rsi[i-1] - 1 < sar:
+                sar = rsi[i-1] - 1
+            if rsi[i-2] - 1 < sar:
+                sar = rsi[i-2] - 1
         else:
-            result[i] = max(result[i], rsi_high.iloc[i-1])
-            if i >= 2:
-                result[i] = max(result[i], rsi_high.iloc[i-2])
+            if rsi[i-1] + 1 > sar:
+                sar = rsi[i-1] + 1
+            if rsi[i-2] + 1 > sar:
+                sar = rsi[i-2] + 1
+        
+        result[i] = sar
+        is_below[i] = below
+    
+    return result, is_below
+
+def calculate_parabolic_sar_on_rsi(rsi, start=0.02, increment=0.02, maximum=0.2):
+    """
+    Calculate Parabolic SAR on RSI values (not price)
+    This is the key difference - SAR is applied to RSI line itself
+    
+    Based on ChartPrime's Pine Script implementation
+    """
+    result, is_below = _sar_on_rsi_kernel(
+        rsi.to_numpy(dtype=np.float64, copy=True),
+        float(start),
+        float(increment),
+        float(maximum)
+    )
     
     return pd.Series(result, index=rsi.index), pd.Series(is_below, index=rsi.index)
 
@@ -103,17 +160,21 @@ def calculate_parabolic_rsi(df, rsi_length=14, sar_start=0.02, sar_increment=0.0
     
     Returns dataframe with columns: rsi, sar, is_below
     """
-    # Calculate RSI
-    df['rsi'] = calculate_rsi(df['close'], length=rsi_length)
+    # Calculate RSI and hand the raw array straight to the SAR kernel
+    rsi = _rsi_array(df['close'].to_numpy(dtype=np.float64), rsi_length)
     
     # Apply Parabolic SAR to RSI values
-    df['sar'], df['is_below'] = calculate_parabolic_sar_on_rsi(
-        df['rsi'],
-        start=sar_start,
-        increment=sar_increment,
-        maximum=sar_max
+    sar, is_below = _sar_on_rsi_kernel(
+        rsi,
+        float(sar_start),
+        float(sar_increment),
+        float(sar_max)
     )
     
+    df['rsi'] = rsi
+    df['sar'] = sar
+    df['is_below'] = is_below
+    
     return df
 
 def detect_all_signals(df, upper_threshold=70, lower_threshold=30):
@@ -137,83 +198,102 @@ def detect_all_signals(df, upper_threshold=70, lower_threshold=30):
     if len(df) < 2:
         return []
     
-    latest = df.iloc[-1]
-    previous = df.iloc[-2]
+    # Read the last two bars straight from the column arrays (no row Series per call)
+    sar = df['sar'].to_numpy()
+    is_below = df['is_below'].to_numpy()
+    latest_sar, previous_sar = sar[-1], sar[-2]
+    latest_is_below, previous_is_below = is_below[-1], is_below[-2]
     
     signals = []
     
     # Check if we have valid data
-    if pd.isna(latest['sar']) or pd.isna(previous['sar']):
+    if math.isnan(latest_sar) or math.isnan(previous_sar):
         return signals
     
     # Check for SAR direction flip (equivalent to barstate.isconfirmed)
-    sar_flipped = latest['is_below'] != previous['is_below']
+    sar_flipped = latest_is_below != previous_is_below
     
     if not sar_flipped:
         return signals
     
-    # Regular Signals (Small Diamonds) - SAR direction flip only
-    if latest['is_below']:  # SAR flipped to bullish
+    # Each flip direction maps to exactly one fixed signal list, built in place
+    # (regular, strong, chart) instead of re-scanning the list for chart signals
+    if latest_is_below:  # SAR flipped to bullish
         # sig_up = isBelow != isBelow[1] and isBelow and barstate.isconfirmed
-        signals.append('REGULAR_BUY')
-        
-        # Strong signal condition: also check if SAR <= 30
-        if latest['sar'] <= lower_threshold:
-            # s_sig_up = isBelow != isBelow[1] and isBelow and barstate.isconfirmed and sar_rsi <= lower_
-            signals.append('STRONG_BUY')
-    
-    else:  # SAR flipped to bearish  
-        # sig_dn = isBelow != isBelow[1] and not isBelow and barstate.isconfirmed
-        signals.append('REGULAR_SELL')
+        # s_sig_up = sig_up and sar_rsi <= lower_
+        if latest_sar <= lower_threshold:
+            return ['REGULAR_BUY', 'STRONG_BUY', 'CHART_STRONG_BUY']  # Big diamond below bar
         
-        # Strong signal condition: also check if SAR >= 70
-        if latest['sar'] >= upper_threshold:
-            # s_sig_dn = isBelow != isBelow[1] and not isBelow and barstate.isconfirmed and sar_rsi >= upper_
-            signals.append('STRONG_SELL')
-    
-    # Chart signals (what shows on price chart)
-    chart_signals = []
-    
-    if 'STRONG_BUY' in signals:
-        chart_signals.append('CHART_STRONG_BUY')  # Big diamond below bar
-    elif 'REGULAR_BUY' in signals and latest['sar'] >= lower_threshold:
-        chart_signals.append('CHART_REGULAR_BUY')  # Small diamond below bar
-        
-    if 'STRONG_SELL' in signals:
-        chart_signals.append('CHART_STRONG_SELL')  # Big diamond above bar  
-    elif 'REGULAR_SELL' in signals and latest['sar'] <= upper_threshold:
-        chart_signals.append('CHART_REGULAR_SELL')  # Small diamond above bar
+        # Chart Rsi Up = sig_up and sar_rsi >= lower_ (always true once strong is ruled out)
+        return ['REGULAR_BUY', 'CHART_REGULAR_BUY']  # Small diamond below bar
     
-    # Combine all signals
-    all_signals = signals + chart_signals
+    # SAR flipped to bearish
+    # sig_dn = isBelow != isBelow[1] and not isBelow and barstate.isconfirmed
+    # s_sig_dn = sig_dn and sar_rsi >= upper_
+    if latest_sar >= upper_threshold:
+        return ['REGULAR_SELL', 'STRONG_SELL', 'CHART_STRONG_SELL']  # Big diamond above bar
     
-    return all_signals
+    # Chart Rsi Dn = sig_dn and sar_rsi <= upper_ (always true once strong is ruled out)
+    return ['REGULAR_SELL', 'CHART_REGULAR_SELL']  # Small diamond above bar
 
-def is_signal_fresh(candle_timestamp, current_time, freshness_window_hours=1):
+def detect_signals_bulk(df, upper_threshold=70, lower_threshold=30):
     """
-    Check if signal is fresh (within freshness window)
-    Equivalent to barstate.isconfirmed - only alert on completed candles that are recent
+    Vectorized detect_all_signals over every bar (for backtests)
+    
+    Adds boolean columns regular_buy, regular_sell, strong_buy, strong_sell.
+    Each bar is flagged exactly as detect_all_signals would report it if that bar were the latest.
     """
-    if isinstance(candle_timestamp, str):
-        candle_time = datetime.fromisoformat(candle_timestamp.replace('Z', '+00:00'))
-    else:
-        candle_time = pd.to_datetime(candle_timestamp)
+    sar = df['sar'].to_numpy(dtype=np.float64)
+    is_below = df['is_below'].to_numpy(dtype=bool)
+    
+    # SAR direction flip with valid SAR on both bars
+    valid = ~np.isnan(sar)
+    flipped = np.zeros(len(df), dtype=bool)
+    flipped[1:] = (is_below[1:] != is_below[:-1]) & valid[1:] & valid[:-1]
     
-    if isinstance(current_time, str):
-        current_time = datetime.fromisoformat(current_time.replace('Z', '+00:00'))
-    elif not isinstance(current_time, datetime):
-        current_time = pd.to_datetime(current_time)
+    regular_buy = flipped & is_below
+    regular_sell = flipped & ~is_below
+    
+    df['regular_buy'] = regular_buy
+    df['regular_sell'] = regular_sell
+    df['strong_buy'] = regular_buy & (sar <= lower_threshold)
+    df['strong_sell'] = regular_sell & (sar >= upper_threshold)
+    
+    return df
+
+_NS_PER_HOUR = 3_600_000_000_000
+
+def _to_ns(timestamp):
+    """
+    Convert a timestamp (pd.Timestamp, datetime, np.datetime64 or ISO string) to int nanoseconds since epoch
+    Timezone-aware values are converted to naive UTC
+    """
+    if isinstance(timestamp, np.datetime64):
+        return int(timestamp.astype('datetime64[ns]').astype(np.int64))
     
-    # Make timezone-aware if needed
-    if candle_time.tzinfo is None:
-        candle_time = candle_time.replace(tzinfo=None)
-    if current_time.tzinfo is None:
-        current_time = current_time.replace(tzinfo=None)
+    if not isinstance(timestamp, pd.Timestamp):
+        if isinstance(timestamp, str):
+            timestamp = timestamp.replace('Z', '+00:00')
+        timestamp = pd.Timestamp(timestamp)
     
-    time_diff = current_time - candle_time
-    freshness_window = timedelta(hours=freshness_window_hours)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
     
-    return time_diff <= freshness_window
+    return timestamp.value
+
+def freshness_cutoff_ns(current_time, freshness_window_hours=1):
+    """
+    Oldest candle time (int ns, naive UTC like _to_ns) that still counts as fresh
+    Compute once per scan and compare candle timestamps' .value against it
+    """
+    return _to_ns(current_time) - freshness_window_hours * _NS_PER_HOUR
+
+def is_signal_fresh(candle_timestamp, current_time, freshness_window_hours=1):
+    """
+    Check if signal is fresh (within freshness window)
+    Equivalent to barstate.isconfirmed - only alert on completed candles that are recent
+    """
+    return _to_ns(candle_timestamp) >= freshness_cutoff_ns(current_time, freshness_window_hours)
 
 def should_alert(symbol, signals, candle_timestamp, last_alerts_db, current_time):
     """
@@ -230,22 +310,25 @@ def should_alert(symbol, signals, candle_timestamp, last_alerts_db, current_time
     
     # Check for duplicates
     fresh_signals = []
-    current_time_dt = pd.to_datetime(current_time)
+    current_ns = _to_ns(current_time)
     
     for signal in signals:
         signal_key = f"{symbol}_{signal}"
         
         # Check if we've alerted this signal recently (within 2 hours to prevent spam)
-        if signal_key in last_alerts_db:
-            last_alert_time = pd.to_datetime(last_alerts_db[signal_key])
-            time_since_last = current_time_dt - last_alert_time
+        # Single probe: most symbol+signal keys have never alerted
+        last_alert = last_alerts_db.get(signal_key)
+        if last_alert is not None:
+            # Alert times are stored as int ns; older history files hold ISO strings
+            if not isinstance(last_alert, int):
+                last_alert = _to_ns(last_alert)
             
             # Don't alert same signal within 2 hours
-            if time_since_last < timedelta(hours=2):
+            if current_ns - last_alert < 2 * _NS_PER_HOUR:
                 continue
         
         fresh_signals.append(signal)
         # Update last alert time
-        last_alerts_db[signal_key] = current_time_dt.isoformat()
+        last_alerts_db[signal_key] = current_ns
     
     return len(fresh_signals) > 0, fresh_signals
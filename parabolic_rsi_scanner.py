@@ -2,11 +2,19 @@ import os
 import ccxt
 import pandas as pd
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from indicators import calculate_parabolic_rsi, detect_all_signals, should_alert
+from functools import lru_cache
+from indicators import calculate_parabolic_rsi, detect_all_signals, freshness_cutoff_ns, should_alert
 from data_fetcher import fetch_ohlcv_multi_exchange
 from telegram_alerts import send_telegram_message
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional - stdlib json is used when it isn't installed
+    orjson = None
+
 # Configuration
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
@@ -18,15 +26,42 @@ SAR_MAX = 0.2
 UPPER_THRESHOLD = 70
 LOWER_THRESHOLD = 30
 FRESHNESS_HOURS = 1  # Only alert signals within 1 hour
+FETCH_WORKERS = 8  # Concurrent OHLCV fetches (scan is bound by exchange round trips)
+
+# Timeframe -> minutes (TradingView interval parameter)
+TIMEFRAME_MINUTES = {
+    '1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30,
+    '1h': 60, '2h': 120, '4h': 240, '6h': 360, '8h': 480, '12h': 720,
+    '1d': 1440, '1w': 10080
+}
 
 # Alert history file to prevent duplicates
 ALERT_HISTORY_FILE = 'alert_history.json'
 
+def _json_dumps(obj):
+    """Serialize to indented JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+def _json_loads(data):
+    """Parse JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@lru_cache(maxsize=4)
+def _parse_coins_file(filename, mtime_ns):
+    """Parse coin symbols from text file (cached until the file's mtime changes)"""
+    with open(filename, 'r') as f:
+        coins = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    # Drop repeated entries (keeping file order) so a coin is fetched and alerted once
+    return tuple(dict.fromkeys(coins))
+
 def load_coins(filename='coins.txt'):
     """Load coin symbols from text file"""
     try:
-        with open(filename, 'r') as f:
-            coins = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        coins = list(_parse_coins_file(filename, os.stat(filename).st_mtime_ns))
         print(f"Loaded {len(coins)} coins from {filename}")
         return coins
     except FileNotFoundError:
@@ -36,28 +71,31 @@ def load_coins(filename='coins.txt'):
 def load_alert_history():
     """Load alert history to prevent duplicate alerts"""
     try:
-        with open(ALERT_HISTORY_FILE, 'r') as f:
-            return json.load(f)
+        with open(ALERT_HISTORY_FILE, 'rb') as f:
+            return _json_loads(f.read())
     except FileNotFoundError:
         return {}
+    except ValueError as e:
+        # Unparseable (e.g. truncated) history - start fresh rather than abort the scan
+        print(f"Error reading alert history, starting empty: {e}")
+        return {}
 
 def save_alert_history(alert_history):
-    """Save alert history to file"""
+    """Save alert history to file (written once per run, atomically)"""
     try:
-        with open(ALERT_HISTORY_FILE, 'w') as f:
-            json.dump(alert_history, f, indent=2)
+        tmp_file = ALERT_HISTORY_FILE + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(_json_dumps(alert_history))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, ALERT_HISTORY_FILE)
     except Exception as e:
         print(f"Error saving alert history: {e}")
 
 def create_chart_links(symbol, timeframe='30m'):
     """Create TradingView and CoinGlass links"""
     # Convert timeframe to minutes
-    timeframe_map = {
-        '1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30,
-        '1h': 60, '2h': 120, '4h': 240, '6h': 360, '8h': 480, '12h': 720,
-        '1d': 1440, '1w': 10080
-    }
-    timeframe_minutes = timeframe_map.get(timeframe, 30)
+    timeframe_minutes = TIMEFRAME_MINUTES.get(timeframe, 30)
     
     # Clean symbol (remove /USDT or /USD)
     clean_symbol = symbol.replace('/USDT', '').replace('/USD', '').replace('/', '')
@@ -72,80 +110,96 @@ def scan_coins(symbols, timeframe, current_time, alert_history):
     """Scan all coins for ALL Parabolic RSI signals (regular + strong)"""
     alerts = []
     
-    for symbol in symbols:
-        try:
-            print(f"Analyzing {symbol}...")
-            
-            # Fetch OHLCV data from multiple exchanges
-            df = fetch_ohlcv_multi_exchange(symbol, timeframe, limit=100)
-            
-            if df is None or len(df) < 50:
-                print(f"  ⚠ Insufficient data for {symbol}")
-                continue
-            
-            # Calculate Parabolic RSI indicator
-            df = calculate_parabolic_rsi(
-                df, 
-                rsi_length=RSI_LENGTH,
-                sar_start=SAR_START,
-                sar_increment=SAR_INCREMENT,
-                sar_max=SAR_MAX
-            )
-            
-            # Detect ALL signals (regular + strong + chart)
-            all_signals = detect_all_signals(
-                df, 
-                upper_threshold=UPPER_THRESHOLD,
-                lower_threshold=LOWER_THRESHOLD
-            )
-            
-            if all_signals:
-                latest = df.iloc[-1]
-                candle_timestamp = latest['timestamp']
+    # Oldest last-candle time that can still alert, computed once for the whole scan
+    freshness_cutoff = freshness_cutoff_ns(current_time, FRESHNESS_HOURS)
+    
+    # Fetch OHLCV data concurrently - the scan is bound by exchange round trips.
+    # Results are still analyzed in coin order on this thread.
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        futures = [
+            executor.submit(fetch_ohlcv_multi_exchange, symbol, timeframe, limit=100)
+            for symbol in symbols
+        ]
+        
+        for symbol, future in zip(symbols, futures):
+            try:
+                print(f"Analyzing {symbol}...")
+                
+                # Wait for OHLCV data from multiple exchanges
+                df = future.result()
+                
+                if df is None or len(df) < 50:
+                    print(f"  ⚠ Insufficient data for {symbol}")
+                    continue
                 
-                # Check if we should alert (freshness + no duplicates)
-                should_send_alert, fresh_signals = should_alert(
-                    symbol, all_signals, candle_timestamp, alert_history, current_time
+                # Cheapest filter first: a stale last candle can never produce an alert
+                if df['timestamp'].iat[-1].value < freshness_cutoff:
+                    print(f"  - Latest candle older than {FRESHNESS_HOURS}h, skipping")
+                    continue
+                
+                # Calculate Parabolic RSI indicator
+                df = calculate_parabolic_rsi(
+                    df, 
+                    rsi_length=RSI_LENGTH,
+                    sar_start=SAR_START,
+                    sar_increment=SAR_INCREMENT,
+                    sar_max=SAR_MAX
+                )
+                
+                # Detect ALL signals (regular + strong + chart)
+                all_signals = detect_all_signals(
+                    df, 
+                    upper_threshold=UPPER_THRESHOLD,
+                    lower_threshold=LOWER_THRESHOLD
                 )
                 
-                if should_send_alert:
-                    tv_link, cg_link = create_chart_links(symbol, timeframe)
+                if all_signals:
+                    candle_timestamp = df['timestamp'].iat[-1]
                     
-                    alerts.append({
-                        'symbol': symbol,
-                        'signals': fresh_signals,
-                        'rsi': latest['rsi'],
-                        'sar': latest['sar'],
-                        'price': latest['close'],
-                        'timestamp': candle_timestamp,
-                        'tv_link': tv_link,
-                        'cg_link': cg_link
-                    })
-                    print(f"  ✓ Fresh signals: {fresh_signals}")
+                    # Check if we should alert (freshness + no duplicates)
+                    should_send_alert, fresh_signals = should_alert(
+                        symbol, all_signals, candle_timestamp, alert_history, current_time
+                    )
+                    
+                    if should_send_alert:
+                        tv_link, cg_link = create_chart_links(symbol, timeframe)
+                        
+                        alerts.append({
+                            'symbol': symbol,
+                            'signals': fresh_signals,
+                            'rsi': df['rsi'].iat[-1],
+                            'sar': df['sar'].iat[-1],
+                            'price': df['close'].iat[-1],
+                            'timestamp': candle_timestamp,
+                            'tv_link': tv_link,
+                            'cg_link': cg_link
+                        })
+                        print(f"  ✓ Fresh signals: {fresh_signals}")
+                    else:
+                        print(f"  - Signals detected but not fresh or duplicate: {all_signals}")
                 else:
-                    print(f"  - Signals detected but not fresh or duplicate: {all_signals}")
-            else:
-                print(f"  - No signals")
-                
-        except Exception as e:
-            print(f"  ✗ Error processing {symbol}: {str(e)}")
-            continue
+                    print(f"  - No signals")
+                    
+            except Exception as e:
+                print(f"  ✗ Error processing {symbol}: {str(e)}")
+                continue
     
     return alerts
 
+# Display labels for signal names
+SIGNAL_LABELS = {
+    'STRONG_BUY': '🟢 STRONG BUY',
+    'STRONG_SELL': '🔴 STRONG SELL', 
+    'REGULAR_BUY': '🟡 REGULAR BUY',
+    'REGULAR_SELL': '🟠 REGULAR SELL',
+    'CHART_STRONG_BUY': '💎 Chart Strong Buy',
+    'CHART_STRONG_SELL': '💎 Chart Strong Sell',
+    'CHART_REGULAR_BUY': '◇ Chart Regular Buy', 
+    'CHART_REGULAR_SELL': '◇ Chart Regular Sell'
+}
+
 def format_signal_text(signals):
     """Format signals for display"""
-    signal_map = {
-        'STRONG_BUY': '🟢 STRONG BUY',
-        'STRONG_SELL': '🔴 STRONG SELL', 
-        'REGULAR_BUY': '🟡 REGULAR BUY',
-        'REGULAR_SELL': '🟠 REGULAR SELL',
-        'CHART_STRONG_BUY': '💎 Chart Strong Buy',
-        'CHART_STRONG_SELL': '💎 Chart Strong Sell',
-        'CHART_REGULAR_BUY': '◇ Chart Regular Buy', 
-        'CHART_REGULAR_SELL': '◇ Chart Regular Sell'
-    }
-    
     # Group signals by type
     strong_signals = [s for s in signals if 'STRONG' in s and 'CHART' not in s]
     regular_signals = [s for s in signals if 'REGULAR' in s and 'CHART' not in s]
@@ -156,13 +210,13 @@ def format_signal_text(signals):
     
     # Show strong signals first (highest priority)
     if strong_signals:
-        display_signals.extend([signal_map[s] for s in strong_signals])
+        display_signals.extend([SIGNAL_LABELS[s] for s in strong_signals])
     elif regular_signals:  # Only show regular if no strong signals
-        display_signals.extend([signal_map[s] for s in regular_signals])
+        display_signals.extend([SIGNAL_LABELS[s] for s in regular_signals])
     
     # Add chart signals as additional info
     if chart_signals:
-        display_signals.extend([signal_map[s] for s in chart_signals])
+        display_signals.extend([SIGNAL_LABELS[s] for s in chart_signals])
     
     return display_signals
 
@@ -1,4 +1,14 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared session so repeated sends reuse the TLS connection to api.telegram.org
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
 
 def send_telegram_message(bot_token, chat_id, message, parse_mode='HTML'):
     """
@@ -20,7 +30,7 @@ def send_telegram_message(bot_token, chat_id, message, parse_mode='HTML'):
             'disable_web_page_preview': True
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = _SESSION.post(url, json=payload, timeout=10)
         
         if response.status_code == 200:
             return True